@@ -1,3 +1,78 @@
 import logging
+import queue
+import sys
+import time
 
-logger = logging.getLogger(__name__)
\ No newline at end of file
+from logging.handlers import QueueHandler, QueueListener
+
+logger = logging.getLogger(__name__)
+
+# Clock shared by heartbeat clients and the server. On Linux this is
+# CLOCK_MONOTONIC_COARSE (6, not exported by `time`), served from the
+# vDSO at tick resolution, which is ample for multi-second intervals.
+CLOCK = 6 if sys.platform.startswith("linux") else time.CLOCK_MONOTONIC
+
+
+class _PackageQueueListener(QueueListener):
+    """`QueueListener` that also detaches the package's `QueueHandler` on stop."""
+
+    def __init__(self, log_queue, queue_handler, propagate, *handlers):
+        QueueListener.__init__(self, log_queue, *handlers, respect_handler_level=True)
+        self._queue_handler = queue_handler
+        self._propagate = propagate
+
+    def stop(self):
+        """Detach the `QueueHandler`, restore propagation, then flush and stop."""
+        global _listener
+
+        if _listener is self:
+            _listener = None
+
+        logger.removeHandler(self._queue_handler)
+        logger.propagate = self._propagate
+
+        if self._thread is not None:
+            QueueListener.stop(self)
+
+
+# Listener started by `start_queue_logging`, if any.
+_listener = None
+
+
+def start_queue_logging(*handlers):
+    """Emit this package's log records from a background thread.
+
+    Records are handed to a `QueueHandler`, and a `QueueListener` thread
+    passes them to `handlers`, so `serve` and `run` never block on
+    handler I/O. Call once at process start, after configuring logging;
+    calling again stops and replaces the previous listener.
+
+    Args:
+        *handlers: Handlers that emit the records. Defaults to the root logger's
+            handlers, or `logging.lastResort` if it has none.
+
+    Returns:
+        QueueListener: Started listener. `stop()` detaches the `QueueHandler`,
+            restores propagation, then flushes and stops the thread.
+    """
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+
+    if not handlers:
+        handlers = tuple(logging.getLogger().handlers)
+
+    if not handlers and logging.lastResort is not None:
+        handlers = (logging.lastResort,)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    listener = _PackageQueueListener(log_queue, queue_handler, logger.propagate, *handlers)
+
+    logger.addHandler(queue_handler)
+    logger.propagate = False
+
+    listener.start()
+    _listener = listener
+    return listener
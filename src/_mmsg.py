@@ -0,0 +1,89 @@
+"""ctypes bindings for sendmmsg(2) and recvmmsg(2).
+
+Both calls move a batch of datagrams across the kernel boundary in a single
+syscall. `sendmmsg` / `recvmmsg` are None where libc doesn't provide them
+(IE: macOS); callers are expected to fall back to per-datagram calls.
+"""
+import ctypes
+import os
+
+
+class IOVec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p),
+                ("iov_len", ctypes.c_size_t)]
+
+
+class MsgHdr(ctypes.Structure):
+    _fields_ = [("msg_name", ctypes.c_void_p),
+                ("msg_namelen", ctypes.c_uint32),
+                ("msg_iov", ctypes.POINTER(IOVec)),
+                ("msg_iovlen", ctypes.c_size_t),
+                ("msg_control", ctypes.c_void_p),
+                ("msg_controllen", ctypes.c_size_t),
+                ("msg_flags", ctypes.c_int)]
+
+
+class MMsgHdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", MsgHdr),
+                ("msg_len", ctypes.c_uint)]
+
+
+_libc = ctypes.CDLL(None, use_errno=True)
+
+sendmmsg = getattr(_libc, "sendmmsg", None)
+recvmmsg = getattr(_libc, "recvmmsg", None)
+
+if sendmmsg is not None:
+    sendmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(MMsgHdr), ctypes.c_uint, ctypes.c_int]
+    sendmmsg.restype = ctypes.c_int
+
+if recvmmsg is not None:
+    recvmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(MMsgHdr), ctypes.c_uint, ctypes.c_int, ctypes.c_void_p]
+    recvmmsg.restype = ctypes.c_int
+
+
+class MessageBatch:
+    """Preallocated message headers, each pointing at its own buffer.
+
+    Attributes:
+        count (int): Number of messages.
+        size (int): Size of each message buffer.
+        msgs (ctypes.Array): `struct mmsghdr[count]`.
+        iov (ctypes.Array): `struct iovec[count]`, one per message.
+        slots (list): Writable memoryview of each message buffer.
+    """
+    def __init__(self, count, size):
+        """Allocate the batch.
+
+        Args:
+            count (int): Number of messages.
+            size (int): Size of each message buffer.
+        """
+        self._buffers = (ctypes.c_char * size * count)()
+        self.msgs = (MMsgHdr * count)()
+        self.iov = (IOVec * count)()
+
+        view = memoryview(self._buffers).cast("B")
+        base = ctypes.addressof(self._buffers)
+
+        self.slots = [view[i * size:(i + 1) * size] for i in range(count)]
+
+        for i in range(count):
+            self.iov[i].iov_base = base + i * size
+            self.iov[i].iov_len = size
+            self.msgs[i].msg_hdr.msg_iov = ctypes.pointer(self.iov[i])
+            self.msgs[i].msg_hdr.msg_iovlen = 1
+
+        self.count = count
+        self.size = size
+
+    def at(self, i):
+        """Pointer to the `i`th message header."""
+        return ctypes.cast(ctypes.byref(self.msgs, i * ctypes.sizeof(MMsgHdr)),
+                           ctypes.POINTER(MMsgHdr))
+
+
+def errno_error():
+    """Build an `OSError` from the errno left by the last libc call."""
+    errno = ctypes.get_errno()
+    return OSError(errno, os.strerror(errno))
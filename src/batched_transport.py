@@ -0,0 +1,209 @@
+"""Batched heartbeat transport.
+
+A `BatchedTransport` owns a single AF_UNIX / SOCK_DGRAM socket that any number
+of `HeartbeatClient`s in the same process can share. Outgoing packets are copied
+into a preallocated batch and flushed to the server with one `sendmmsg(2)` call,
+so N clients cost one syscall per flush period rather than N.
+
+The server keys clients by pid, so each client sharing a transport must report
+a distinct `pid` (IE: a supervisor heartbeating for the workers it watches).
+Attaching a second client with the same pid raises `ValueError`.
+
+Usage:
+
+    transport = BatchedTransport("/tmp/unx_ss/server.s", rate=5)
+    transport.start()
+
+    client = HeartbeatClient("/tmp/unx_ss/server.s", transport=transport, pid=worker_pid)
+    ...
+    transport.close()
+
+Platforms without `sendmmsg` (IE: macOS) fall back to one `send` per packet.
+"""
+import logging
+import os
+import select
+import socket
+import threading
+import time
+
+from pathlib import Path
+
+from . import _mmsg
+from .client import FREQ_DEF, SNDBUF_DEF
+
+logger = logging.getLogger(__name__)
+
+# Largest packet sent by a client (register packets).
+PKT_SIZE = 26
+
+# Maximum number of packets flushed per syscall.
+BATCH_DEF = 64
+
+
+class BatchedTransport:
+    """Datagram transport shared between heartbeat clients.
+
+    Attributes:
+        destination (Path): Server socket address.
+        rate (int): Client heartbeat rate. Batches are flushed every `rate / 2` seconds.
+        batch (int): Maximum number of packets per flush.
+        batching (bool): Batch packets. If False, packets are sent immediately.
+    """
+    __slots__ = ("_socket", "_lock", "_pump", "_closed", "_wake_r", "_wake_w", "_count",
+                 "_batch", "_pids", "destination", "rate", "batch", "batching")
+
+    def __init__(self, destination, rate=FREQ_DEF, batch=BATCH_DEF, batching=True):
+        """Constructor.
+
+        Args:
+            destination (str): Destination sockets address.
+            rate (int, optional): Client heartbeat rate. Defaults to FREQ_DEF.
+            batch (int, optional): Maximum packets per flush. Defaults to BATCH_DEF.
+            batching (bool, optional): Batch outgoing packets. Defaults to True.
+        """
+        self._socket = socket.socket(family=socket.AF_UNIX,
+                                     type=  socket.SOCK_DGRAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SNDBUF_DEF)
+        self._lock = threading.Lock()
+        self._pump = None
+        self._closed = False
+
+        # Self-pipe used to wake the pump thread on close.
+        self._wake_r, self._wake_w = os.pipe()
+
+        # Packet slots and message headers are allocated once and
+        # reused for every flush.
+        self._count = 0
+        self._batch = _mmsg.MessageBatch(batch, PKT_SIZE)
+
+        # Pids of the attached clients.
+        self._pids = set()
+
+        self.destination = Path(destination)
+        self.rate = rate
+        self.batch = batch
+        self.batching = batching
+
+    def start(self):
+        """Connect the socket and start the flush thread."""
+        self._socket.connect(str(self.destination))
+
+        if self.batching:
+            self._pump = threading.Thread(target=self._run_pump, daemon=True)
+            self._pump.start()
+
+    def attach(self, pid):
+        """Reserve `pid` for a client sending through this transport.
+
+        Args:
+            pid (int): Process ID the client reports.
+
+        Raises:
+            ValueError: If another attached client already reports `pid`.
+        """
+        with self._lock:
+            if pid in self._pids:
+                raise ValueError(f"pid {pid} is already attached to this transport.")
+
+            self._pids.add(pid)
+
+    def detach(self, pid):
+        """Release `pid`, once its client has deregistered.
+
+        Args:
+            pid (int): Process ID the client reports.
+        """
+        with self._lock:
+            self._pids.discard(pid)
+
+    def enqueue(self, packet):
+        """Queue a signed packet for delivery.
+
+        The packet is copied, so callers may reuse their buffer immediately.
+
+        Args:
+            packet (bytes-like): Signed packet, at most PKT_SIZE bytes.
+        """
+        if not self.batching:
+            self._socket.send(packet)
+            return
+
+        size = len(packet)
+
+        if size > PKT_SIZE:
+            raise ValueError("packet exceeds PKT_SIZE.")
+
+        with self._lock:
+            i = self._count
+
+            self._batch.slots[i][:size] = packet
+            self._batch.iov[i].iov_len = size
+            self._count = i + 1
+
+            if self._count == self.batch:
+                self._flush()
+
+    def flush(self):
+        """Send all queued packets."""
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        """Flush queued packets and release all associated resources."""
+        self._closed = True
+        os.write(self._wake_w, b"\x00")
+
+        if self._pump:
+            self._pump.join()
+
+        try:
+            self.flush()
+        finally:
+            self._socket.close()
+            os.close(self._wake_r)
+            os.close(self._wake_w)
+
+    def _flush(self):
+        """Send queued packets. Caller must hold `self._lock`."""
+        count = self._count
+
+        if not count:
+            return
+
+        self._count = 0
+
+        batch = self._batch
+
+        if _mmsg.sendmmsg is None:
+            for i in range(count):
+                self._socket.send(batch.slots[i][:batch.iov[i].iov_len])
+            return
+
+        fd = self._socket.fileno()
+        sent = 0
+
+        # sendmmsg may send fewer messages than requested.
+        while sent < count:
+            res = _mmsg.sendmmsg(fd, batch.at(sent), count - sent, 0)
+
+            if res < 0:
+                raise _mmsg.errno_error()
+
+            sent += res
+
+    def _run_pump(self):
+        """Flush queued packets every `rate / 2` seconds until closed."""
+        interval = self.rate / 2
+        deadline = time.monotonic() + interval
+
+        while not self._closed:
+            select.select([self._wake_r], [], [], max(0, deadline - time.monotonic()))
+
+            if time.monotonic() >= deadline:
+                deadline += interval
+
+                try:
+                    self.flush()
+                except OSError as e:
+                    logger.warning("Failed Flush | %s | %s", self.destination, e)
@@ -1,23 +1,37 @@
-import json
 import logging
 import os
 import socket
 import struct
-import sys
 import threading
 import time
 
 from pathlib import Path
 
+from . import CLOCK
+
 
 logger = logging.getLogger(__name__)
 
 FREQ_DEF = 5 # Default Heartbeat Rate: 5 seconds
 
+# Requested socket send buffer: 2 MiB.
+SNDBUF_DEF = 2 << 20
+
+# Precompiled packet layouts. The leading pad byte keeps byte 0 zeroed.
+_HB_STRUCT = struct.Struct(">xBQI")
+_REG_STRUCT = struct.Struct(">xBQI12s")
+
+# Timestamp field, the only part of a packet that changes per send.
+_TS_STRUCT = struct.Struct(">Q")
+_TS_OFFSET = 2
+
 
 class HeartbeatClient:
+    __slots__ = ("_stop", "_stopped", "_socket", "_transport",
+                 "_templates", "__pid", "destination", "id", "rate", "verbose")
 
-    def __init__(self, destination, id=None, rate=FREQ_DEF, verbose=False):
+    def __init__(self, destination, id=None, rate=FREQ_DEF, verbose=False, transport=None,
+                 socktype=socket.SOCK_DGRAM, pid=None):
         """Constructor.
 
         Args:
@@ -25,26 +39,52 @@ class HeartbeatClient:
             id (str, optional): Process identifier. Defaults to None.
             rate (int, optional): Outgoing heartbeat rate. Defaults to FREQ_DEF.
             verbose (bool, optional): Verbose log output.
+            transport (BatchedTransport, optional): Shared transport to send packets through.
+                The transport must be started and closed by its owner. Defaults to None.
+            socktype (int, optional): SOCK_DGRAM, SOCK_SEQPACKET (Linux only) or SOCK_STREAM,
+                matching the server's. Defaults to SOCK_DGRAM.
+            pid (int, optional): Process ID reported to the server, which keys clients
+                by it. Clients sharing a transport must each report a distinct pid
+                (IE: that of the process they watch). Defaults to this process's pid.
         """
-        self._condition = threading.Condition()
+        # Shutdown handshake: `_stop` is set by `shutdown`, `_stopped` by `run`.
+        self._stop = threading.Event()
+        self._stopped = threading.Event()
         
         self.destination = Path(destination)
 
-        self.__pid = self.get_pid()
+        self.__pid = self.get_pid() if pid is None else pid
 
         if id:
             self._validate_id(id)
         else:
             id = str(self.__pid)
         
-        self._socket = socket.socket(family=socket.AF_UNIX,
-                                     type=  socket.SOCK_DGRAM)
-        self._shutdown = False
+        # Clients sharing a transport send through its socket, not their own.
+        self._socket = None
+
+        if transport is None:
+            self._socket = socket.socket(family=socket.AF_UNIX,
+                                         type=  socktype)
+            self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SNDBUF_DEF)
+
+        if transport is not None:
+            transport.attach(self.__pid)
+
+        self._transport = transport
 
         self.id = id
         self.rate = rate
         self.verbose = verbose
 
+        # Packet templates: {packet_type: packet}. Type, pid and id never
+        # change, so only the timestamp is rewritten on each send.
+        self._templates = {
+            1: bytearray(_HB_STRUCT.pack(1, 0, self.__pid)),
+            2: bytearray(_REG_STRUCT.pack(2, 0, self.__pid, self.id.encode("utf-8")[:12])),
+            3: bytearray(_HB_STRUCT.pack(3, 0, self.__pid)),
+        }
+
     def run(self):
         """Start the client and serve forever."""
         self._connect()
@@ -53,18 +93,19 @@ class HeartbeatClient:
             self.register()
 
         if self.verbose:
-            logger.info(f"Starting Client | {self.__pid} | {self.id}") 
+            logger.info("Starting Client | %s | %s", self.__pid, self.id)
 
-        while not self._shutdown:
-            try:
+        try:
+            while not self._stop.is_set():
                 self._send(packet_type=1)
-                time.sleep(FREQ_DEF)
 
-            except KeyboardInterrupt:
-                self._safe_exit()
+                # `shutdown` wakes it early.
+                self._stop.wait(timeout=self.rate)
 
-        with self._condition:
-            self._condition.notify_all()
+            self._stopped.set()
+
+        except KeyboardInterrupt:
+            self._safe_exit()
 
     def shutdown(self):
         """Gracefully shutdown the client.
@@ -72,16 +113,18 @@ class HeartbeatClient:
         Must be called in a different thread of execution than `run`.
         """
         if self.verbose:
-            logger.info(f"Shutting Down Client | {self.__pid} | {self.id}") 
+            logger.info("Shutting Down Client | %s | %s", self.__pid, self.id)
 
-        with self._condition:
-            self._shutdown = True
-            self._condition.wait()
-            self._safe_exit()
+        self._stop.set()
+
+        # Block until `run` exits.
+        self._stopped.wait()
+        self._safe_exit()
 
     def _connect(self):
         """Connect and bind socket."""
-        self._socket.connect(str(self.destination))
+        if self._transport is None:
+            self._socket.connect(str(self.destination))
 
     def _validate_id(self, id):
         """Validate the requested client ID.
@@ -101,14 +144,14 @@ class HeartbeatClient:
     def register(self):
         """Register the client with the server."""
         if self.verbose:
-            logger.info(f"Registering Client | {self.__pid} | {self.id}")
+            logger.info("Registering Client | %s | %s", self.__pid, self.id)
 
         self._send(packet_type=2)
     
     def deregister(self):
         """Deregister the client with the server."""
         if self.verbose:
-            logger.info(f"Deregistering Client | {self.__pid} | {self.id}") 
+            logger.info("Deregistering Client | %s | %s", self.__pid, self.id)
 
         self._send(packet_type=3)
     
@@ -124,14 +167,15 @@ class HeartbeatClient:
             packet_type (int): Packet type. Either 1, 2, or 3.
         """
         signed_packet = self._sign_packet(type_=packet_type)
-        
-        if self._handle_packet_size(signed_packet):
+
+        if self._transport is None:
             self._socket.send(signed_packet)
-            
-            if self.verbose:
-                logger.info(f"Successfully Sent Packet | {self.__pid} | {self.id} | {packet_type} | {signed_packet}") 
         else:
-            logger.warning("Invalid Packet: ", signed_packet)
+            self._transport.enqueue(signed_packet)
+
+        if self.verbose:
+            logger.info("Successfully Sent Packet | %s | %s | %s | %s",
+                        self.__pid, self.id, packet_type, bytes(signed_packet))
 
     def _sign_packet(self, type_):
         """Sign the outgoing UDP packet.
@@ -147,45 +191,27 @@ class HeartbeatClient:
         identifier if `self.id` is defined: a string of size 0 < num chars <= 12.
 
         -------- ------------------------ ------------------------ ------------------------------------------
-        | Type |     Unix Timestamp     |    Process ID (pid)    |       *REGISTER ONLY: Identifier        |
+        | Type |  Monotonic Timestamp   |    Process ID (pid)    |       *REGISTER ONLY: Identifier        |
         -------- ------------------------ ------------------------ ------------------------------------------
         1-2 Bytes        8 Bytes                   4 Bytes                         *12 Bytes
 
-        Args:
-            type_ (str): Either "heartbeat", "register", or "deregister".
-        """        
-        packet = bytearray(26) if type_ == 2 else bytearray(14)
-
-        unix_t = time.time()
+        The timestamp is an unsigned count of nanoseconds on `CLOCK`.
 
-        type_bytes = struct.pack(">b", type_)
-        time_bytes = struct.pack(">d", unix_t)
+        On a 64-bit system, max PID size is 4194304 (2 ** 22),
+        so it will always fit into 4 bytes.
 
-        # On a 64-bit system, max PID size is 4194304 (2 ** 22), 
-        # so this will always fit into 4 bytes.    
-        pid_bytes = struct.pack(">i", self.__pid)
-
-        # Populate bytearray
-        packet[1:2] = type_bytes
-        packet[2:10] = time_bytes
-        packet[10:14] = pid_bytes
-
-        if type_ == 2:
-            ident_bytes = struct.pack("12s", self.id.encode("UTF-8")) 
-            packet[14:26] = ident_bytes
-
-        return packet
-
-    def _handle_packet_size(self, packet):
-        """Length bytes packet <= 26 bytes.
+        The timestamp is written into a template owned by the client,
+        so the returned packet is only valid until the next call.
 
         Args:
-            packet (bytes): UDP Packet.
+            type_ (int): Packet type. Either 1, 2, or 3.
 
         Returns:
-            bool: True/False.
+            bytearray: Signed packet.
         """
-        return len(packet) <= 26
+        packet = self._templates[type_]
+        _TS_STRUCT.pack_into(packet, _TS_OFFSET, time.clock_gettime_ns(CLOCK))
+        return packet
 
     def _safe_exit(self):
         """Gracefully Exit.
@@ -198,11 +224,14 @@ class HeartbeatClient:
             self.deregister()
 
         finally:
-            self._socket.shutdown(socket.SHUT_RDWR)
-            self._socket.close()
+            if self._socket is not None:
+                self._socket.shutdown(socket.SHUT_RDWR)
+                self._socket.close()
+            else:
+                self._transport.detach(self.__pid)
             
             if self.verbose:
-                logger.info(f"Successfully Shut Down | {self.__pid} | {self.id} |")
+                logger.info("Successfully Shut Down | %s | %s |", self.__pid, self.id)
             return
 
     def get_pid(self):
@@ -2,11 +2,13 @@
 
 Capable of handling up to 1000 requests/s.
 """
-import json
+import array
+import functools
 import logging
 import struct
 import time
 
+from . import CLOCK
 from .socket_server import UnixSocketServer
 
 logger = logging.getLogger(__name__)
@@ -25,56 +27,170 @@ HBT_DEF = 10
 # Registering a new client sends a 26 byte packet. 
 HBT_SIZE = 26
 
+# `last_heartbeat` of a released client slot. Never considered stale.
+_FREE = 2 ** 63 - 1
+
+# Precompiled packet layouts. The leading pad byte skips byte 0.
+_HB_U = struct.Struct(">xBQI")
+_REG_U = struct.Struct(">xBQI12s")
+_unpack_hb = _HB_U.unpack_from
+_unpack_reg = _REG_U.unpack_from
+
+
+@functools.lru_cache(maxsize=1024)
+def _decode_ident(ident_bytes):
+    """Decode the identifier of a register packet.
+
+    Cached, since clients re-register under the same identifier.
+
+    Args:
+        ident_bytes (bytes): Null padded 12 byte identifier.
+
+    Returns:
+        str: Process Identifier.
+    """
+    return ident_bytes.rstrip(b"\x00").decode("UTF-8", "replace")
+
+
+def _scan_stale(last, threshold):
+    """Find the indexes of stale heartbeats.
+
+    In the common case nothing is stale, which a single `min` pass over
+    the array (in C) settles without executing bytecode per client.
+
+    Args:
+        last (array.array): Last heartbeat of each client.
+        threshold (int): Heartbeats older than this are stale.
+
+    Returns:
+        list: Indexes into `last`.
+    """
+    if not last or min(last) >= threshold:
+        return []
+
+    return [i for i, beat in enumerate(last) if beat < threshold]
+
 
 class HeartbeatServer(UnixSocketServer):
+    __slots__ = ("_pid_index", "_pids", "_last", "_names", "_free", "_dispatch", "verbose")
 
-    def __init__(self, timeout=HBT_DEF, bufsize=HBT_SIZE, path=None, bind=True, verbose=False):
-        UnixSocketServer.__init__(self, timeout, bufsize, path, bind)
+    def __init__(self, timeout=HBT_DEF, bufsize=HBT_SIZE, path=None, bind=True, verbose=False, **kwargs):
+        """Initialize the server.
+
+        Additional keyword arguments are passed to `UnixSocketServer`.
+        """
+        UnixSocketServer.__init__(self, timeout, bufsize, path, bind, **kwargs)
         
-        # {client_pid: {"process_name": x, "last_heartbeat": y}
-        self.clients = {}
+        # Client state is stored column-wise. Each client owns one index into
+        # `_pids`, `_last` and `_names`: {client_pid: index}
+        self._pid_index = {}
+        self._pids = array.array("i")
+        self._last = array.array("q")
+        self._names = []
+
+        # Indexes released by deregistered clients.
+        self._free = []
+
+        # {packet_type: handler}
+        self._dispatch = {1: self._heartbeat,
+                          2: self._register,
+                          3: self._deregister}
         
         # Verbose Log Output
         self.verbose = verbose
-        
+
+    @property
+    def clients(self):
+        """Read-only copy of the registered clients.
+
+        Rebuilt on every access, at O(N) cost; writing to the returned
+        dict has no effect on the server. Use `client` to look up a
+        single pid, IE: from a `notify` override.
+
+        Returns:
+            dict: {client_pid: {"process_name": x, "last_heartbeat": y}}
+        """
+        return {pid: {"process_name": self._names[i], "last_heartbeat": self._last[i]}
+                for pid, i in self._pid_index.items()}
+
+    def client(self, pid):
+        """Look up a single registered client.
+
+        Args:
+            pid (int): Client process ID.
+
+        Returns:
+            tuple: (process_name, last_heartbeat), or None if `pid`
+                isn't registered. `last_heartbeat` is in nanoseconds
+                on `CLOCK`.
+        """
+        i = self._pid_index.get(pid)
+
+        if i is None:
+            return None
+
+        return self._names[i], self._last[i]
+
     def notify(self, pid):
         """Handle missed heartbeat. 
         
         Default: Send log message.
         
         Can be overwritten by Subclass / Mixin. This function will
-        block the main `serve` method.
+        block the main `serve` method. Overrides should read client
+        state through `client(pid)` rather than `clients`.
         """
-        process_name = self.clients[pid]["process_name"]
-        timestamp = time.time()
+        process_name, last_heartbeat = self.client(pid)
 
-        logger.warning(f"Missed Heartbeat | {pid} | {timestamp} | {process_name}")
+        # Same clock and unit (`CLOCK`, nanoseconds) as the "Heartbeat" log line.
+        logger.warning("Missed Heartbeat | %s | %s | %s", pid, last_heartbeat, process_name)
+
+    def split_stream(self, buffer):
+        """Split complete packets off the front of a SOCK_STREAM buffer.
+
+        Packets are framed by their type byte: register packets are
+        26 bytes, every other type 14.
+
+        Args:
+            buffer (bytearray): Bytes read from a connection.
+
+        Returns:
+            list: Complete packets, in order.
+        """
+        packets = []
+        offset = 0
+        end = len(buffer)
+
+        # Walk the buffer and trim it once; trimming per packet is quadratic.
+        with memoryview(buffer) as view:
+            while end - offset >= 2:
+                size = _REG_U.size if view[offset + 1] == 2 else _HB_U.size
+
+                if end - offset < size:
+                    break
+
+                packets.append(view[offset:offset + size].tobytes())
+                offset += size
+
+        del buffer[:offset]
+        return packets
 
     def handle_request(self, request):
         """Handle a new message.
 
         Args:
-            data (bytes): Raw UDP message.
-            address (str): Sender's address.
+            request (tuple): (data, address), where `data` is the raw
+                message and `address` is unused.
         """
-        data, address = request
-        
-        try:
-            struc = self._unpack(data)
-            
-            _type = struc[0]
-            args = struc[1:] # pid, timestamp, process_name
-
-            match _type:
-                case 1:
-                    self._heartbeat(*args)
-                case 2:
-                    self._register(*args)
-                case 3:
-                    self._deregister(*args)
-            
-        except KeyError: # Maybe don't need this?
-            logger.warning(f"Invalid Message | {struc}")
+        data, _ = request
+
+        _type, pid, timestamp, ident_bytes = self._unpack(data)
+        handler = self._dispatch.get(_type)
+
+        if handler:
+            handler(pid, timestamp, ident_bytes)
+        else:
+            logger.warning("Invalid Message | %s", bytes(data))
 
     def _unpack(self, packet):
         """Unpack recieved UDP packet.
@@ -83,77 +199,127 @@ class HeartbeatServer(UnixSocketServer):
         are 14 bytes, and register packets are 26 bytes:
 
         -------- ------------------------ ------------------------ ------------------------------------------
-        | Type |     Unix Timestamp     |    Process ID (pid)    |       *REGISTER ONLY: Identifier        |
+        | Type |  Monotonic Timestamp   |    Process ID (pid)    |       *REGISTER ONLY: Identifier        |
         -------- ------------------------ ------------------------ ------------------------------------------
         1-2 Bytes        8 Bytes                   4 Bytes                         *12 Bytes
 
+        The timestamp is an unsigned count of nanoseconds on `CLOCK`.
+
+        The identifier is returned undecoded; only `_register` needs it.
+
         Args:
             packet (bytes): UDP Packet recieved from `HeartbeatClient`.
+
+        Returns:
+            tuple: (type, pid, timestamp, ident_bytes), where `ident_bytes`
+                is None for heartbeat and deregister packets.
         """
-        ident = None
-        _type = packet[1]
-        timestamp = struct.unpack(">d", packet[2:10])[0]
-        pid = struct.unpack(">i", packet[10:14])[0]
-        
-        if _type == 2:
-            ident_bytes = struct.unpack("12s", packet[14:26])[0]
-            ident = ident_bytes.decode('UTF-8').rstrip("\x00")
+        if packet[1] == 2:
+            _type, timestamp, pid, ident_bytes = _unpack_reg(packet)
+            return _type, pid, timestamp, ident_bytes
 
-        return _type, pid, timestamp, ident
+        _type, timestamp, pid = _unpack_hb(packet)
+        return _type, pid, timestamp, None
     
-    def _heartbeat(self, pid, timestamp, process_name):
+    def _heartbeat(self, pid, timestamp, ident_bytes):
         """Process recieved heartbeat.
 
+        Clients first seen through a heartbeat have no process name
+        until they register.
+
         Args:
             pid (int): Process ID.
-            timestamp (float): UNIX Timestamp.
-            process_name (str): Process Identifier.
+            timestamp (int): Monotonic timestamp, in nanoseconds.
+            ident_bytes (None): Unused.
         """
-        if pid in self.clients:
-            self.clients[pid]["last_heartbeat"] = timestamp
-        else:
-            self.clients[pid] = {"process_name": process_name, 
-                                "last_heartbeat": timestamp}
+        i = self._pid_index.get(pid)
+
+        if i is None:
+            i = self._allocate(pid)
+
+        self._last[i] = timestamp
         
         if self.verbose:
-            process_name = self.clients[pid]["process_name"]
-            logger.info(f"Heartbeat | {pid} | {timestamp} | {process_name}")
+            process_name = self._names[i]
+            logger.info("Heartbeat | %s | %s | %s", pid, timestamp, process_name)
 
-    def _register(self, pid, timestamp, process_name):
+    def _register(self, pid, timestamp, ident_bytes):
         """Forceably register a new client.
 
         Args:
             pid (int): Process ID.
-            timestamp (float): UNIX Timestamp.
-            process_name (str): Process Identifier.
+            timestamp (int): Monotonic timestamp, in nanoseconds.
+            ident_bytes (bytes): Null padded process identifier.
         """
-        self.clients[pid] = {"process_name": process_name, 
-                            "last_heartbeat": timestamp}
+        process_name = _decode_ident(ident_bytes)
+        i = self._pid_index.get(pid)
+
+        if i is None:
+            i = self._allocate(pid)
+
+        self._names[i] = process_name
+        self._last[i] = timestamp
         
         if self.verbose:
-            logger.info(f"Registered | {pid} | {timestamp} | {process_name}")
+            logger.info("Registered | %s | %s | %s", pid, timestamp, process_name)
 
-    def _deregister(self, pid, timestamp, process_name):
+    def _deregister(self, pid, timestamp, ident_bytes):
         """Forceably deregister a client.
 
+        Unknown clients are ignored.
+
         Args:
             pid (int): Process ID.
+            timestamp (int): Monotonic timestamp, in nanoseconds.
+            ident_bytes (None): Unused.
         """
-        process_name = self.clients[pid]["process_name"]
-        del self.clients[pid]
+        i = self._pid_index.pop(pid, None)
+
+        if i is None:
+            return
+
+        process_name = self._names[i]
+
+        self._last[i] = _FREE
+        self._names[i] = None
+        self._free.append(i)
 
         if self.verbose:
-            logger.info(f"Deregistered | {pid} | {timestamp} | {process_name}")
+            logger.info("Deregistered | %s | %s | %s", pid, timestamp, process_name)
 
     def request_hook(self):
         """Check clients for recent heartbeats."""
-        currtime = time.time()
-        threshold = currtime - HBT_DEF
+        currtime = time.clock_gettime_ns(CLOCK)
+        threshold = currtime - HBT_DEF * 1_000_000_000
+
+        pids, last = self._pids, self._last
 
-        # Copy() instead of blocking.
-        clients_cpy = self.clients.copy()
+        # The stale indexes are collected up front rather than copying the
+        # clients. `notify` may deregister clients, so each slot is checked
+        # again; a released slot holds _FREE and a reused one is fresh.
+        for i in _scan_stale(last, threshold):
+            if last[i] < threshold:
+                self.notify(pids[i])
+
+    def _allocate(self, pid):
+        """Allocate an index for a new client.
+
+        Released indexes are reused before the arrays are grown.
+
+        Args:
+            pid (int): Process ID.
+
+        Returns:
+            int: Client index.
+        """
+        if self._free:
+            i = self._free.pop()
+            self._pids[i] = pid
+        else:
+            i = len(self._last)
+            self._pids.append(pid)
+            self._last.append(_FREE)
+            self._names.append(None)
 
-        for client, data in clients_cpy.items():
-            last_beat = data["last_heartbeat"]
-            if last_beat < threshold:
-                self.notify(client)
\ No newline at end of file
+        self._pid_index[pid] = i
+        return i
\ No newline at end of file
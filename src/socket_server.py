@@ -1,196 +1,590 @@
-"""
-A Unix Domain Socket (UDS) is a bidirectional communication socket
-for communicating between processes on the same operating system/machine. 
-
-SOCK_DGRAM / AF_UNIX  : Datagram oriented, UDP-like.
-
-UNIX domain sockets only perform a subset of normal socket operations (like no routing); which 
-makes them faster and lighter than IP sockets.
-
-Binding to the File System:
-
-After creatin a UNIX domain socket, it MUST be bound to a unique file path (rather than an IP and port).
-A file descriptor is created which points to the "file".
-
-Naming Conventions:
-
-Emacs' name scheme, e.g. "/tmp/bar1000/what_the_socket_is_for", where "bar" is the application name again.
-
-Advantage of using /tmp/ - dangling sockets will be automatically removed at boot. (IE: If the server crashes,
-you won't be able to restart the socket server without first removing the socket file. This won't happen if its stored
-in /tmp/.)
-"""
-import logging
-import os
-import secrets
-import selectors
-import socket
-import sys
-import threading
-
-logger = logging.getLogger(__name__)
-
-if not hasattr(socket, "AF_UNIX"):
-    sys.exit("unix or unix-like system required.")
-
-BASE_PATH = "/tmp/"
-BASE_DIR = "unx_ss"
-BASE_IDENT = "server"
-
-
-class UnixSocketServer:
-    """Base class representing a Unix socket server.
-
-    Attributes:
-        timeout (int): Socket read timeout.
-        path (str): Socket bind path.
-        bufsize (int): Socket maximum read size.
-    """
-    def __init__(self, timeout, bufsize, path=None, bind=True):
-        """Initialize the server.
-
-        Args:
-            timeout (int, optional): Socket read timeout. Defaults to TMO_DEF.
-            bufsize (int, optional): Socket maximum read size. Defaults to BUF_DEF.
-            path (str, optional): Socket's local address. Defaults to None.
-            bind (bool, optional): Bind the socket on server creation. Defaults to True.
-
-        """
-        self._socket = socket.socket(family=socket.AF_UNIX,
-                                     type=  socket.SOCK_DGRAM)
-
-        self._selector = selectors.SelectSelector()
-        self._condition = threading.Condition()
-
-        self._shutdown = False
-
-        self.timeout = timeout
-        self.bufsize = bufsize
-        self.path = path
-
-        if bind:
-            self._bind_local()
-    
-    def path(self):
-        """Get the socket's local address.
-
-        Returns:
-            str: Socket's local address.
-        """
-        return self.path
-
-    def serve(self):
-        """Serve until a signal is recieved to the process or
-        a shutdown request is received.
-
-        *Must be run in another thread.
-        """
-        self._selector.register(self, selectors.EVENT_READ)
-        
-        try:
-            while not self._shutdown:
-                # Blocks until socket is readable
-                events = self._selector.select(self.timeout)
-
-                if self._shutdown:
-                    break
-                
-                if events:
-                    request = self.get_request()
-                    self.handle_request(request)
-                    
-                self.request_hook()
-
-            # Unblock shutdown thread.
-            with self._condition:
-                self._condition.notify_all()
-        
-        except KeyboardInterrupt:
-            self._safe_exit()
-    
-    def shutdown(self):
-        """Gracefully shutdown the server and free all associated resources.
-        
-        *Must be called in a seperate thread from where `serve` is running.
-        """
-        with self._condition:
-            self._shutdown = True
-            self._condition.wait() # Block until shutdown completes
-            self._safe_exit()
-
-    def get_request(self):
-        """Read from the stream.
-
-        `recvfrom` is a blocking call, however this method
-        is not intended to block. It's expected that the socket
-        is ready to be read from before this method is called.
-        """
-        return self._socket.recvfrom(self.bufsize)
-
-    def handle_request(self, request):
-        """Handle request."""
-        pass
-
-    def request_hook(self):
-        """Handle events after listening."""
-        pass
-
-    def _bind_local(self):
-        """Bind the socket to a local directory.
-        
-        If `path` is None, a directory is automatically
-        generated in /tmp/ using the following convention:
-
-        (Inspired by Emacs)
-
-        "/<BASE_PATH>/<BASE_DIR>/<BASE_IDENT>.<hash>", where:
-
-        `hash` - 6 byte hash
-
-        """
-        if not self._socket:
-            raise Exception("cannot bind a socket that hasn't been created.") # Edit
-        
-        path = self.path
-
-        if not path:
-            dir_path = os.path.join(BASE_PATH, BASE_DIR)
-
-            if not os.path.isdir(dir_path):
-                os.mkdir(dir_path)
-
-            ident = f"{BASE_IDENT}.{secrets.token_urlsafe(nbytes=6)}"
-            
-            self.path = path = os.path.join(dir_path, ident)
-
-        if os.path.exists(path):
-            # Try unlinking before binding
-            # Ref: https://svnweb.freebsd.org/base/head/usr.sbin/syslogd/syslogd.c?revision=291328&view=markup#l565
-            os.unlink(path)
-
-        self._socket.bind(path)
-    
-    def fileno(self):
-        """Return the sockets file descriptor.
-        
-        Required for use with selectors.SelectSelector().
-        """
-        return self._socket.fileno()
-    
-    def _safe_exit(self):
-        """Cleanup resources and gracefully exit the server.
-        
-        `shutdown` does not completely terminate the connection, it sends a FIN call to
-        the other socket, which indicates to the other socket to terminate additional writes.
-        The file descriptor is NOT released with `shutdown`.
-
-        `close` releases all resources associated with the socket, including the file descriptor.
-        """
-        self._socket.shutdown(socket.SHUT_RDWR) # Block reading & writing.
-        self._socket.close()
-        self._cleanup()
-
-    def _cleanup(self):
-        """Remove the bound socket file."""
-        if self.path:
-            os.unlink(self.path)
+"""
+A Unix Domain Socket (UDS) is a bidirectional communication socket
+for communicating between processes on the same operating system/machine. 
+
+SOCK_DGRAM / AF_UNIX  : Datagram oriented, UDP-like.
+SOCK_SEQPACKET / AF_UNIX : Connection oriented, preserves message boundaries (Linux only).
+SOCK_STREAM / AF_UNIX : Connection oriented byte stream, TCP-like.
+
+UNIX domain sockets only perform a subset of normal socket operations (like no routing); which 
+makes them faster and lighter than IP sockets.
+
+Binding to the File System:
+
+After creatin a UNIX domain socket, it MUST be bound to a unique file path (rather than an IP and port).
+A file descriptor is created which points to the "file".
+
+Naming Conventions:
+
+Emacs' name scheme, e.g. "/tmp/bar1000/what_the_socket_is_for", where "bar" is the application name again.
+
+Advantage of using /tmp/ - dangling sockets will be automatically removed at boot. (IE: If the server crashes,
+you won't be able to restart the socket server without first removing the socket file. This won't happen if its stored
+in /tmp/.)
+"""
+import logging
+import os
+import selectors
+import socket
+import struct
+import sys
+import threading
+import time
+
+from . import _mmsg
+
+logger = logging.getLogger(__name__)
+
+if not hasattr(socket, "AF_UNIX"):
+    sys.exit("unix or unix-like system required.")
+
+BASE_PATH = "/tmp/"
+BASE_DIR = "unx_ss"
+BASE_IDENT = "server"
+
+# Shared directory for generated socket paths. Created once on import, and
+# again by `_bind_local` if it is removed while the process runs.
+_SOCK_DIR = os.path.join(BASE_PATH, BASE_DIR)
+os.makedirs(_SOCK_DIR, exist_ok=True)
+
+# Maximum number of datagrams read per `get_requests` call.
+BATCH_DEF = 64
+
+# Minimum read size on SOCK_STREAM connections. `split_stream` frames the
+# bytes, so reading well past `bufsize` batches many messages per wakeup.
+STREAM_READ_DEF = 64 << 10
+
+# Requested socket buffers: 4 MiB. Absorbs bursts that arrive between
+# wakeups instead of dropping them. The kernel caps the effective value at
+# net.core.rmem_max / net.core.wmem_max.
+RCVBUF_DEF = 4 << 20
+SNDBUF_DEF = 4 << 20
+
+# Linux accepts socket flags as part of `type`, which saves the fcntl calls
+# made by `setblocking`. Other platforms (IE: macOS) fall back to `setblocking`.
+# Python sockets are close-on-exec either way.
+_SOCK_FLAGS = getattr(socket, "SOCK_NONBLOCK", 0) | getattr(socket, "SOCK_CLOEXEC", 0)
+
+# Busy polling: seconds without traffic before the serve loop stops
+# spinning and starts yielding, then stops yielding and parks.
+SPIN_DEF = 0.1
+YIELD_DEF = 1.0
+
+_sched_yield = getattr(os, "sched_yield", lambda: time.sleep(0))
+
+# struct ucred: {pid, uid, gid}
+_UCRED = struct.Struct("3i")
+
+
+def _peercred(conn):
+    """Get the credentials of a connected peer.
+
+    Returns:
+        tuple: (pid, uid, gid), or None where SO_PEERCRED is unsupported.
+    """
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+
+    return _UCRED.unpack(conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, _UCRED.size))
+
+
+class UnixSocketServer:
+    """Base class representing a Unix socket server.
+
+    Attributes:
+        timeout (int): Socket read timeout.
+        path (str): Socket bind path.
+        bufsize (int): Socket maximum read size.
+        socktype (int): Socket type.
+    """
+    __slots__ = ("_socket", "_shared", "_selector", "_stop", "_stopped", "_batch", "_recv",
+                 "_recv_buf", "_mv", "_stream_mv", "_sized", "timeout", "bufsize", "path", "abstract",
+                 "busy_poll", "socktype", "autosize")
+
+    def __init__(self, timeout, bufsize, path=None, bind=True, abstract=False, busy_poll=False,
+                 socktype=socket.SOCK_DGRAM, rcvbuf=RCVBUF_DEF, sndbuf=SNDBUF_DEF, fd=None,
+                 autosize=False):
+        """Initialize the server.
+
+        Args:
+            timeout (int, optional): Socket read timeout. Defaults to TMO_DEF.
+            bufsize (int, optional): Socket maximum read size. Defaults to BUF_DEF.
+            path (str, optional): Socket's local address. Defaults to None.
+            bind (bool, optional): Bind the socket on server creation. Defaults to True.
+            abstract (bool, optional): Bind in the Linux abstract namespace rather than
+                the file system. Defaults to False.
+            busy_poll (bool, optional): Serve with the user-space polling loop (spin,
+                then yield, then park in the selector) rather than blocking in the
+                selector. Trades CPU for wakeup latency. Defaults to False.
+                Requires SOCK_DGRAM.
+            socktype (int, optional): SOCK_DGRAM, SOCK_SEQPACKET (Linux only) or
+                SOCK_STREAM. Defaults to SOCK_DGRAM.
+            rcvbuf (int, optional): Requested SO_RCVBUF. Defaults to RCVBUF_DEF.
+            sndbuf (int, optional): Requested SO_SNDBUF. Defaults to SNDBUF_DEF.
+            fd (int, optional): Already bound socket to serve on (IE: inherited by
+                a forked worker). The descriptor is duplicated; `path` is ignored
+                and the socket isn't re-bound or unlinked on exit. Defaults to None.
+            autosize (bool, optional): Peek at the first datagram's size (Linux) and
+                grow `bufsize` to fit it. Defaults to False.
+
+        Datagrams and SOCK_SEQPACKET messages longer than `bufsize` are
+        truncated. SOCK_STREAM doesn't preserve message boundaries; reads are
+        buffered per connection and split into messages by `split_stream`.
+
+        """
+        if abstract and not sys.platform.startswith("linux"):
+            raise ValueError("abstract socket namespace requires Linux.")
+
+        if busy_poll and socktype != socket.SOCK_DGRAM:
+            raise ValueError("busy polling requires SOCK_DGRAM.")
+
+        if fd is not None:
+            self._socket = socket.fromfd(fd, socket.AF_UNIX, socktype)
+            path = None
+            bind = False
+        else:
+            self._socket = socket.socket(family=socket.AF_UNIX,
+                                         type=  socktype | _SOCK_FLAGS)
+
+        self._shared = fd is not None
+
+        if self._shared or not hasattr(socket, "SOCK_NONBLOCK"):
+            self._socket.setblocking(False)
+
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, sndbuf)
+
+        # Bound once; saves two attribute lookups per read.
+        self._recv = self._socket.recv_into
+
+        # epoll on Linux, kqueue on BSD/macOS.
+        self._selector = selectors.DefaultSelector()
+
+        # Shutdown handshake: `_stop` is set by `shutdown`, `_stopped` by `serve`.
+        self._stop = threading.Event()
+        self._stopped = threading.Event()
+
+        self.timeout = timeout
+        self.bufsize = bufsize
+        self.path = path
+        self.abstract = abstract
+        self.busy_poll = busy_poll
+        self.socktype = socktype
+        self.autosize = autosize
+
+        # Receive buffers for `get_request` / `get_requests`, allocated once
+        # (or again when `autosize` grows them).
+        self._sized = False
+        self._alloc_buffers(bufsize)
+
+        # Read buffer shared by SOCK_STREAM connections; each connection
+        # keeps only its unconsumed bytes.
+        self._stream_mv = None
+
+        if socktype == socket.SOCK_STREAM:
+            self._stream_mv = memoryview(bytearray(max(bufsize, STREAM_READ_DEF)))
+
+        if bind:
+            self._bind_local()
+
+    @classmethod
+    def pair(cls, timeout, bufsize, **kwargs):
+        """Create two servers on the ends of a connected socket pair.
+
+        Neither end has an address, so nothing is bound, generated or
+        unlinked. Each end receives what is sent on the other, which
+        suits local IPC between a parent and a forked child.
+
+        Args:
+            timeout (int): Socket read timeout.
+            bufsize (int): Socket maximum read size.
+            **kwargs: Passed to each server's constructor.
+
+        Returns:
+            tuple: (server, server)
+        """
+        a, b = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+
+        # Each server wraps a duplicate; the originals are closed on exit.
+        with a, b:
+            return (cls(timeout=timeout, bufsize=bufsize, fd=a.fileno(), **kwargs),
+                    cls(timeout=timeout, bufsize=bufsize, fd=b.fileno(), **kwargs))
+    
+    def serve(self):
+        """Serve until a signal is recieved to the process or
+        a shutdown request is received.
+
+        *Must be run in another thread.
+        """
+        self._selector.register(self, selectors.EVENT_READ)
+        
+        try:
+            if self.busy_poll:
+                self._serve_polling()
+            else:
+                self._serve_select()
+
+            # Unblock shutdown thread.
+            self._stopped.set()
+        
+        except KeyboardInterrupt:
+            self._safe_exit()
+    
+    def _serve_select(self):
+        """Block in the selector between requests."""
+        # Bound once; the loop body runs for every wakeup.
+        is_stopped = self._stop.is_set
+        select = self._selector.select
+        read_ready = self._read_ready
+        request_hook = self.request_hook
+        timeout = self.timeout
+
+        while not is_stopped():
+            # Blocks until socket is readable
+            events = select(timeout)
+
+            if is_stopped():
+                break
+            
+            for key, _ in events:
+                read_ready(key)
+                
+            request_hook()
+
+    def _read_ready(self, key):
+        """Handle a readable socket.
+
+        Args:
+            key (selectors.SelectorKey): Selector key of the readable socket.
+        """
+        if key.fileobj is not self:
+            conn = key.fileobj
+            peercred, pending = key.data
+            data, _ = self.get_connection_request(conn, peercred)
+
+            if not data:
+                # Peer closed the connection.
+                self._selector.unregister(conn)
+                conn.close()
+
+            elif self.socktype == socket.SOCK_STREAM:
+                pending += data
+
+                for message in self.split_stream(pending):
+                    self.handle_request((message, peercred))
+
+            else:
+                self.handle_request((data, peercred))
+
+        elif self.socktype == socket.SOCK_DGRAM:
+            for request in self.get_requests():
+                self.handle_request(request)
+
+        else:
+            conn, _ = self._socket.accept()
+            conn.setblocking(False)
+            # (peercred, bytes read but not yet split into messages)
+            self._selector.register(conn, selectors.EVENT_READ, (_peercred(conn), bytearray()))
+
+    def split_stream(self, buffer):
+        """Split complete messages off the front of a SOCK_STREAM buffer.
+
+        Consumed bytes are removed from `buffer`; an incomplete trailing
+        message is left for the next read.
+
+        Default: everything read so far is one message. Subclasses with
+        framed messages should override this.
+
+        Args:
+            buffer (bytearray): Bytes read from a connection.
+
+        Returns:
+            list: Complete messages, in order.
+        """
+        message = bytes(buffer)
+        del buffer[:]
+        return [message]
+
+    def _serve_polling(self):
+        """Poll the socket, backing off as it goes idle.
+
+        Phases, by time since the last datagram:
+
+            < SPIN_DEF  - Spin on non-blocking reads.
+            < YIELD_DEF - Yield the CPU between reads.
+            otherwise   - Park in the selector until traffic arrives.
+
+        Any datagram resets to spinning. `request_hook` runs every
+        `timeout` seconds.
+        """
+        # Bound once; the loop body runs for every poll.
+        is_stopped = self._stop.is_set
+        get_requests = self.get_requests
+        handle_request = self.handle_request
+        request_hook = self.request_hook
+        select = self._selector.select
+        monotonic = time.monotonic
+        timeout = self.timeout
+
+        now = monotonic()
+        last_activity = now
+        next_hook = now + timeout
+
+        while not is_stopped():
+            requests = get_requests()
+            now = monotonic()
+
+            if requests:
+                for request in requests:
+                    handle_request(request)
+
+                last_activity = now
+
+            elif now - last_activity >= YIELD_DEF:
+                select(max(0, next_hook - now))
+                now = monotonic()
+
+            elif now - last_activity >= SPIN_DEF:
+                _sched_yield()
+
+            if now >= next_hook:
+                request_hook()
+                next_hook = now + timeout
+
+    def shutdown(self):
+        """Gracefully shutdown the server and free all associated resources.
+        
+        *Must be called in a seperate thread from where `serve` is running.
+        """
+        self._stop.set()
+
+        # Block until shutdown completes
+        self._stopped.wait()
+        self._safe_exit()
+
+    def get_request(self):
+        """Read from the stream.
+
+        The socket is non-blocking; `BlockingIOError` is raised
+        if no datagram is queued. The sender's address is not
+        collected.
+
+        The returned view points into a buffer owned by the server
+        and is only valid until the next call.
+
+        Returns:
+            tuple: (memoryview, None)
+        """
+        if self.autosize and not self._sized:
+            self._autosize()
+
+        nbytes = self._recv(self._mv, self.bufsize)
+        return self._mv[:nbytes], None
+
+    def get_connection_request(self, conn, peercred):
+        """Read from an accepted connection.
+
+        Args:
+            conn (socket.socket): Accepted connection.
+            peercred (tuple): Peer credentials, captured on accept.
+
+        SOCK_STREAM connections are read up to `STREAM_READ_DEF` bytes
+        at a time, into a buffer owned by the server; the returned view
+        is only valid until the next call.
+
+        Returns:
+            tuple: (bytes-like, peercred), where `peercred` is (pid, uid, gid),
+                or None where unsupported. The data is empty once the
+                peer has closed the connection.
+        """
+        if self._stream_mv is not None:
+            nbytes = conn.recv_into(self._stream_mv)
+            return self._stream_mv[:nbytes], peercred
+
+        return conn.recv(self.bufsize), peercred
+
+    def get_requests(self, max_batch=BATCH_DEF):
+        """Read up to `max_batch` queued datagrams.
+
+        Uses a single `recvmmsg` call where available. Sender
+        addresses are not collected.
+
+        The returned views point into buffers owned by the server
+        and are only valid until the next call.
+
+        Args:
+            max_batch (int, optional): Maximum datagrams to read. Capped at BATCH_DEF.
+
+        Returns:
+            list: [(memoryview, None), ...]. Empty if no datagram is queued.
+        """
+        if self.autosize and not self._sized:
+            try:
+                self._autosize()
+            except BlockingIOError:
+                return []
+
+        batch = self._batch
+        count = min(max_batch, batch.count)
+
+        if _mmsg.recvmmsg is None:
+            requests = []
+
+            for slot in batch.slots[:count]:
+                try:
+                    nbytes = self._recv(slot)
+                except BlockingIOError:
+                    break
+
+                requests.append((slot[:nbytes], None))
+
+            return requests
+
+        res = _mmsg.recvmmsg(self._socket.fileno(), batch.msgs, count, 0, None)
+
+        if res < 0:
+            err = _mmsg.errno_error()
+
+            if isinstance(err, BlockingIOError):
+                return []
+            raise err
+
+        msgs, slots = batch.msgs, batch.slots
+        return [(slots[i][:msgs[i].msg_len], None) for i in range(res)]
+
+    def handle_request(self, request):
+        """Handle request."""
+        pass
+
+    def request_hook(self):
+        """Handle events after listening."""
+        pass
+
+    def _alloc_buffers(self, bufsize):
+        """Allocate the receive buffers.
+
+        Args:
+            bufsize (int): Socket maximum read size.
+        """
+        self._recv_buf = bytearray(bufsize)
+        self._mv = memoryview(self._recv_buf)
+        self._batch = _mmsg.MessageBatch(BATCH_DEF, bufsize)
+
+    def _autosize(self):
+        """Grow the receive buffers to fit the next queued datagram.
+
+        `MSG_PEEK | MSG_TRUNC` returns the datagram's full length on Linux
+        without dequeuing it. Elsewhere the length is capped at the peeked
+        size, so the buffers are left as they are.
+
+        `BlockingIOError` is raised if no datagram is queued.
+        """
+        size = self._recv(self._mv[:1], 1, socket.MSG_PEEK | socket.MSG_TRUNC)
+
+        if size > self.bufsize:
+            self.bufsize = size
+            self._alloc_buffers(size)
+
+        self._sized = True
+
+    def _bind_local(self):
+        """Bind the socket to a local directory.
+        
+        If `path` is None, a socket path is generated inside the shared
+        directory (created once, on import) using the following convention:
+
+        (Inspired by Emacs)
+
+        "/<BASE_PATH>/<BASE_DIR>/<BASE_IDENT>.<hash>", where:
+
+        `hash` - 8 random bytes (`os.urandom`), as 16 hex characters
+
+        If `abstract` is set, the socket is bound in the Linux abstract
+        namespace instead ("\\0<BASE_IDENT>.<hash>"), which creates no file
+        and needs no cleanup.
+
+        Connection oriented sockets start listening once bound.
+
+        """
+        if not self._socket:
+            raise Exception("cannot bind a socket that hasn't been created.") # Edit
+        
+        path = self.path
+
+        if self.abstract:
+            if not path:
+                path = f"{BASE_IDENT}.{os.urandom(8).hex()}"
+
+            if not path.startswith("\0"):
+                path = "\0" + path
+
+            self.path = path
+
+        else:
+            if not path:
+                ident = f"{BASE_IDENT}.{os.urandom(8).hex()}"
+                
+                self.path = path = os.path.join(_SOCK_DIR, ident)
+
+            try:
+                # Try unlinking before binding
+                # Ref: https://svnweb.freebsd.org/base/head/usr.sbin/syslogd/syslogd.c?revision=291328&view=markup#l565
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+        try:
+            self._socket.bind(path)
+        except FileNotFoundError:
+            # The shared directory was removed since import (IE: by a tmp
+            # cleaner); recreate it once and retry.
+            if os.path.dirname(path) != _SOCK_DIR:
+                raise
+
+            os.makedirs(_SOCK_DIR, exist_ok=True)
+            self._socket.bind(path)
+
+        if self.socktype != socket.SOCK_DGRAM:
+            self._socket.listen()
+    
+    def fileno(self):
+        """Return the sockets file descriptor.
+        
+        Required for use with selectors.
+        """
+        return self._socket.fileno()
+    
+    def _safe_exit(self):
+        """Cleanup resources and gracefully exit the server.
+        
+        `shutdown` does not completely terminate the connection, it sends a FIN call to
+        the other socket, which indicates to the other socket to terminate additional writes.
+        The file descriptor is NOT released with `shutdown`.
+
+        `close` releases all resources associated with the socket, including the file descriptor.
+
+        Accepted connections are closed along with the server. A socket passed in
+        by `fd` is only closed; shutting it down would stop every process serving it.
+        """
+        if not self._shared:
+            self._socket.shutdown(socket.SHUT_RDWR) # Block reading & writing.
+
+        # `get_map` is None once the selector is closed (IE: a second exit).
+        selector_map = self._selector.get_map()
+
+        if selector_map is not None:
+            for key in list(selector_map.values()):
+                if key.fileobj is not self:
+                    key.fileobj.close()
+
+        self._selector.close()
+        self._socket.close()
+        self._cleanup()
+
+    def _cleanup(self):
+        """Remove the bound socket file, if it still exists."""
+        if self.path and not self.path.startswith("\0"):
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,116 @@
+import socket
+import unittest
+import unittest.mock as mock
+
+from src.batched_transport import BatchedTransport, PKT_SIZE
+from src.client import HeartbeatClient
+from src.heartbeat_server import HeartbeatServer
+from src.socket_server import UnixSocketServer
+
+
+class TestBatchedTransport(unittest.TestCase):
+
+    def setUp(self):
+        self.server = UnixSocketServer(timeout=5, bufsize=PKT_SIZE)
+        self.server._socket.settimeout(1)
+        self.transport = BatchedTransport(self.server.path, rate=60, batch=4)
+        self.transport.start()
+
+    def tearDown(self):
+        try:
+            self.transport.close()
+            self.server._safe_exit()
+        except OSError:
+            pass
+
+    def test_enqueue_waits_for_flush(self):
+        self.transport.enqueue(b"\x00\x01abc")
+        self.server._socket.settimeout(0.05)
+
+        with self.assertRaises(socket.timeout):
+            self.server.get_request()
+
+    def test_flush_sends_queued_packets(self):
+        packets = [b"\x00\x01abc", b"\x00\x02" + b"x" * 24, b"\x00\x03"]
+
+        for packet in packets:
+            self.transport.enqueue(packet)
+        self.transport.flush()
+
+        for packet in packets:
+            data, _ = self.server.get_request()
+            self.assertEqual(packet, data)
+
+    def test_enqueue_copies_packet(self):
+        packet = bytearray(b"\x00\x01abc")
+        self.transport.enqueue(packet)
+        packet[2:5] = b"xyz"
+        self.transport.flush()
+
+        data, _ = self.server.get_request()
+        self.assertEqual(b"\x00\x01abc", data)
+
+    def test_full_batch_flushes(self):
+        for i in range(4):
+            self.transport.enqueue(bytes([0, i]))
+
+        for i in range(4):
+            data, _ = self.server.get_request()
+            self.assertEqual(bytes([0, i]), data)
+
+    def test_pump_flushes_on_deadline(self):
+        transport = BatchedTransport(self.server.path, rate=0.1)
+        transport.start()
+        transport.enqueue(b"\x00\x01")
+
+        data, _ = self.server.get_request()
+        self.assertEqual(b"\x00\x01", data)
+        transport.close()
+
+    def test_close_flushes_queued_packets(self):
+        self.transport.enqueue(b"\x00\x03")
+        self.transport.close()
+
+        data, _ = self.server.get_request()
+        self.assertEqual(b"\x00\x03", data)
+
+    def test_client_with_transport_has_no_socket(self):
+        with mock.patch("socket.socket") as mock_socket:
+            client = HeartbeatClient(self.server.path, transport=self.transport)
+        mock_socket.assert_not_called()
+        client._safe_exit()
+        self.transport.flush()
+
+        data, _ = self.server.get_request()
+        self.assertEqual(3, data[1])
+
+    def test_clients_sharing_transport_register_separately(self):
+        server = HeartbeatServer()
+        transport = BatchedTransport(server.path, rate=60)
+        transport.start()
+
+        first = HeartbeatClient(server.path, id="first", transport=transport, pid=1001)
+        second = HeartbeatClient(server.path, id="second", transport=transport, pid=1002)
+        first.register()
+        second.register()
+        transport.flush()
+
+        for request in server.get_requests():
+            server.handle_request(request)
+
+        self.assertEqual("first", server.client(1001)[0])
+        self.assertEqual("second", server.client(1002)[0])
+        transport.close()
+        server._safe_exit()
+
+    def test_attach_rejects_duplicate_pid(self):
+        HeartbeatClient(self.server.path, transport=self.transport, pid=1001)
+        with self.assertRaises(ValueError):
+            HeartbeatClient(self.server.path, transport=self.transport, pid=1001)
+
+    def test_batching_disabled_sends_immediately(self):
+        with mock.patch("socket.socket"):
+            transport = BatchedTransport("/simulated/path/to/socket.s", batching=False)
+        transport.enqueue(b"\x00\x01")
+        transport._socket.send.assert_called_with(b"\x00\x01")
+        transport.close()
@@ -0,0 +1,59 @@
+import os
+import time
+import unittest
+
+from src import CLOCK
+from src.client import HeartbeatClient
+from src.heartbeat_server import HeartbeatServer, _decode_ident
+
+
+class TestHeartbeatClient(unittest.TestCase):
+
+    def setUp(self):
+        self.server = HeartbeatServer(bind=False)
+        self.client = HeartbeatClient("/simulated/path/to/socket.s", id="test")
+
+    def tearDown(self):
+        try:
+            self.client._socket.close()
+            self.server._safe_exit()
+        except OSError:
+            pass
+
+    def test_packet_round_trips_through_server(self):
+        for type_, size in ((1, 14), (2, 26), (3, 14)):
+            before = time.clock_gettime_ns(CLOCK)
+            packet = self.client._sign_packet(type_)
+            after = time.clock_gettime_ns(CLOCK)
+
+            self.assertEqual(size, len(packet))
+
+            _type, pid, timestamp, ident_bytes = self.server._unpack(packet)
+            self.assertEqual(type_, _type)
+            self.assertEqual(os.getpid(), pid)
+            self.assertTrue(before <= timestamp <= after)
+
+            if type_ == 2:
+                self.assertEqual("test", _decode_ident(ident_bytes))
+            else:
+                self.assertEqual(None, ident_bytes)
+
+    def test_sign_packet_reuses_template(self):
+        for type_ in (1, 2, 3):
+            first = self.client._sign_packet(type_)
+            before = bytes(first)
+            second = self.client._sign_packet(type_)
+
+            self.assertIs(first, second)
+            self.assertEqual(before[:2], bytes(second[:2]))
+            self.assertEqual(before[10:], bytes(second[10:]))
+
+    def test_sign_packet_rewrites_only_timestamp(self):
+        packet = self.client._sign_packet(2)
+        packet[2:10] = b"\x00" * 8
+        before = bytes(packet)
+
+        self.client._sign_packet(2)
+
+        self.assertNotEqual(before[2:10], bytes(packet[2:10]))
+        self.assertEqual(before[:2] + before[10:], bytes(packet[:2] + packet[10:]))
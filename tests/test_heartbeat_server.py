@@ -1,7 +1,13 @@
+import time
 import unittest
 import unittest.mock as mock
 
-from src.heartbeat_server import HeartbeatServer
+from socket import AF_UNIX, SOCK_STREAM, socket
+
+from array import array
+
+from src import CLOCK
+from src.heartbeat_server import HeartbeatServer, _decode_ident, _scan_stale
 
 
 class TestHeartbeatServer(unittest.TestCase):
@@ -12,40 +18,40 @@ class TestHeartbeatServer(unittest.TestCase):
     def tearDown(self):
         try:
             self.server._safe_exit()
-        except:
+        except OSError:
             pass
 
     def test_unpack_heartbeat_packet(self):
-        bytes_ = b'\x00\x01A\xd8\xff\x06\xfb\xaa<M\x00\x16\xd6"'
+        bytes_ = b'\x00\x01\x17G\x8e\xfd\xbc\x8b\x89\x84\x00\x16\xd6"'
         
         res_type, res_pid, res_timestamp, res_ident = self.server._unpack(bytes_)
         
         self.assertEqual(1, res_type)
         self.assertEqual(1496610, res_pid)
-        self.assertEqual(1677466606.6599305, res_timestamp)
+        self.assertEqual(1677466606659930500, res_timestamp)
         self.assertEqual(None, res_ident)
 
     def test_unpack_register_packet(self):
-        bytes_ = b'\x00\x02A\xd8\xff\x08a\xccY\x16\x00\x16\xdc 1498144\x00\x00\x00\x00\x00'
+        bytes_ = b'\x00\x02\x17G\x90KF*\x83\xb8\x00\x16\xdc 1498144\x00\x00\x00\x00\x00'
         
         res_type, res_pid, res_timestamp, res_ident = self.server._unpack(bytes_)
         
         self.assertEqual(2, res_type)
         self.assertEqual(1498144, res_pid)
-        self.assertEqual(1677468039.1929374, res_timestamp)
-        self.assertEqual("1498144", res_ident)
+        self.assertEqual(1677468039192937400, res_timestamp)
+        self.assertEqual(b"1498144\x00\x00\x00\x00\x00", res_ident)
 
     def test_unpack_deregister_packet(self):
-        bytes_ = b'\x00\x03A\xd8\xff\t\x95\xa1\x85\x06\x00\x16\xddm'
+        bytes_ = b'\x00\x03\x17G\x91i\xf73\x8f\x00\x00\x16\xddm'
         
         res_type, res_pid, res_timestamp, res_ident = self.server._unpack(bytes_)
         
         self.assertEqual(3, res_type)
         self.assertEqual(1498477, res_pid)
-        self.assertEqual(1677469270.523744, res_timestamp)
+        self.assertEqual(1677469270523744000, res_timestamp)
 
     def test_handle_request_calls_heartbeat(self):
-        bytes_ = b'\x00\x01A\xd8\xff\x06\xfb\xaa<M\x00\x16\xd6"'
+        bytes_ = b'\x00\x01\x17G\x8e\xfd\xbc\x8b\x89\x84\x00\x16\xd6"'
         request = (bytes_, 0000)
         with mock.patch("src.heartbeat_server.HeartbeatServer._heartbeat"):
             server = HeartbeatServer()
@@ -54,7 +60,7 @@ class TestHeartbeatServer(unittest.TestCase):
             server._safe_exit()
 
     def test_handle_request_calls_register(self):
-        bytes_ = b'\x00\x02A\xd8\xff\x08a\xccY\x16\x00\x16\xdc 1498144\x00\x00\x00\x00\x00'
+        bytes_ = b'\x00\x02\x17G\x90KF*\x83\xb8\x00\x16\xdc 1498144\x00\x00\x00\x00\x00'
         request = (bytes_, 0000)
         with mock.patch("src.heartbeat_server.HeartbeatServer._register"):
             server = HeartbeatServer()
@@ -63,7 +69,7 @@ class TestHeartbeatServer(unittest.TestCase):
             server._safe_exit()
 
     def test_handle_request_calls_deregister(self):
-        bytes_ = b'\x00\x03A\xd8\xff\t\x95\xa1\x85\x06\x00\x16\xddm'
+        bytes_ = b'\x00\x03\x17G\x91i\xf73\x8f\x00\x00\x16\xddm'
         request = (bytes_, 0000)
         with mock.patch("src.heartbeat_server.HeartbeatServer._deregister"):
             server = HeartbeatServer()
@@ -71,35 +77,67 @@ class TestHeartbeatServer(unittest.TestCase):
             server._deregister.assert_called()
             server._safe_exit()
 
+    def test_handle_request_ignores_unknown_type(self):
+        bytes_ = b'\x00\x07\x17G\x91i\xf73\x8f\x00\x00\x16\xddm'
+        with mock.patch("src.heartbeat_server.HeartbeatServer._heartbeat"), \
+             mock.patch("src.heartbeat_server.HeartbeatServer._register"), \
+             mock.patch("src.heartbeat_server.HeartbeatServer._deregister"):
+            server = HeartbeatServer()
+            server.handle_request((bytes_, None))
+            server._heartbeat.assert_not_called()
+            server._register.assert_not_called()
+            server._deregister.assert_not_called()
+            server._safe_exit()
+
     def test_heartbeat_records_data(self):
-        pid, timestamp, ident = 9999, 1111, "test"
+        pid, timestamp = 9999, 1111
         
-        self.server._heartbeat(pid, timestamp, ident)
+        self.server._heartbeat(pid, timestamp, None)
         
         self.assertIn(pid, self.server.clients)
         self.assertEqual(self.server.clients[pid]["last_heartbeat"], timestamp)
-        self.assertEqual(self.server.clients[pid]["process_name"], ident)
+        self.assertEqual(self.server.clients[pid]["process_name"], None)
 
     def test_register_records_client(self):
-        pid, timestamp, ident = 9999, 1111, "test"
+        pid, timestamp, ident = 9999, 1111, b"test\x00\x00\x00\x00\x00\x00\x00\x00"
         
         self.server._register(pid, timestamp, ident)
         
         self.assertIn(pid, self.server.clients)
         self.assertEqual(self.server.clients[pid]["last_heartbeat"], timestamp)
-        self.assertEqual(self.server.clients[pid]["process_name"], ident)
+        self.assertEqual(self.server.clients[pid]["process_name"], "test")
+
+    def test_client_returns_name_and_last_heartbeat(self):
+        self.server._register(9999, 1111, b"test")
+        self.assertEqual(("test", 1111), self.server.client(9999))
+
+    def test_client_unknown_pid(self):
+        self.assertEqual(None, self.server.client(9999))
+
+    def test_clients_is_a_copy(self):
+        self.server._register(9999, 1111, b"test")
+        self.server.clients[9999]["last_heartbeat"] = 0
+        self.assertEqual(("test", 1111), self.server.client(9999))
 
     def test_register_overwrites_existing_client(self):
-        pid, timestamp, ident = 9999, 1111, "test"
+        pid, timestamp = 9999, 1111
         
-        self.server._heartbeat(pid, timestamp, ident)
-        self.server._register(9999, 2222, "test")
+        self.server._heartbeat(pid, timestamp, None)
+        self.server._register(9999, 2222, b"test")
 
         self.assertEqual(self.server.clients[pid]["last_heartbeat"], 2222)
-        self.assertEqual(self.server.clients[pid]["process_name"], ident)
+        self.assertEqual(self.server.clients[pid]["process_name"], "test")
+
+    def test_register_reuses_decoded_ident(self):
+        ident = b"cached\x00\x00\x00\x00\x00\x00"
+        self.server._register(9999, 1111, ident)
+        hits = _decode_ident.cache_info().hits
+
+        self.server._register(9999, 2222, ident)
+        self.assertEqual(hits + 1, _decode_ident.cache_info().hits)
 
     def test_deregister_removes_client(self):
-        pid, timestamp, ident = 9999, 1111, "test"
+        pid, timestamp, ident = 9999, 1111, b"test"
         
         self.server._register(pid, timestamp, ident)
         self.assertIn(pid, self.server.clients)
@@ -107,12 +145,104 @@ class TestHeartbeatServer(unittest.TestCase):
         self.server._deregister(pid, timestamp, ident)
         self.assertNotIn(pid, self.server.clients)
 
+    def test_deregister_unknown_client(self):
+        self.server._deregister(9999, 1111, None)
+        self.assertNotIn(9999, self.server.clients)
+
+    def test_deregister_reuses_index(self):
+        self.server._register(9999, 1111, b"test")
+        self.server._deregister(9999, 1111, None)
+        self.server._register(8888, 2222, b"other")
+
+        self.assertEqual(1, len(self.server._last))
+        self.assertEqual(self.server.clients[8888]["process_name"], "other")
+
+    def test_request_hook_skips_deregistered_client(self):
+        with mock.patch("src.heartbeat_server.HeartbeatServer.notify"):
+            server = HeartbeatServer()
+            server._register(9999, 1111, b"test")
+            server._deregister(9999, 1111, None)
+            server.request_hook()
+            server.notify.assert_not_called()
+            server._safe_exit()
+
     def test_request_hook_notifies_missed_heartbeat(self):
         with mock.patch("src.heartbeat_server.HeartbeatServer.notify"):
             server = HeartbeatServer()
-            server.clients[9999] = {"process_name": "test", 
-                                    "last_heartbeat": 1111}
+            server._register(9999, 1111, b"test")
             server.request_hook()
             server.notify.assert_called()
             server._safe_exit()
-        
\ No newline at end of file
+
+    def test_notify_logs_last_heartbeat(self):
+        self.server._register(9999, 1111, b"test")
+        with mock.patch("src.heartbeat_server.logger") as mock_logger:
+            self.server.notify(9999)
+        mock_logger.warning.assert_called_with("Missed Heartbeat | %s | %s | %s", 9999, 1111, "test")
+
+    def test_request_hook_tolerates_deregister_in_notify(self):
+        notified = []
+
+        def notify(pid):
+            notified.append(pid)
+            self.server._deregister(8888, 1111, None)
+
+        self.server._register(9999, 1111, b"first")
+        self.server._register(8888, 1111, b"second")
+        with mock.patch.object(HeartbeatServer, "notify", side_effect=notify):
+            self.server.request_hook()
+        self.assertEqual([9999], notified)
+
+    def test_split_stream_keeps_partial_packet(self):
+        heartbeat = b'\x00\x01\x17G\x8e\xfd\xbc\x8b\x89\x84\x00\x16\xd6"'
+        register = b'\x00\x02\x17G\x90KF*\x83\xb8\x00\x16\xdc 1498144\x00\x00\x00\x00\x00'
+        buffer = bytearray(heartbeat + register[:10])
+
+        self.assertEqual([heartbeat], self.server.split_stream(buffer))
+        self.assertEqual(register[:10], buffer)
+
+        buffer += register[10:]
+        self.assertEqual([register], self.server.split_stream(buffer))
+        self.assertEqual(b"", buffer)
+
+    def test_serve_stream_splits_coalesced_packets(self):
+        heartbeat = b'\x00\x01\x17G\x8e\xfd\xbc\x8b\x89\x84\x00\x16\xd6"'
+        deregister = b'\x00\x03\x17G\x91i\xf73\x8f\x00\x00\x16\xd6"'
+        hooks = []
+
+        def hook():
+            hooks.append(dict(server._pid_index))
+            if len(hooks) == 2:
+                server._stop.set()
+
+        server = HeartbeatServer(timeout=0.05, socktype=SOCK_STREAM)
+        client = socket(AF_UNIX, SOCK_STREAM)
+        client.connect(server.path)
+        # Accept, then a single read carrying all three packets.
+        client.sendall(heartbeat + heartbeat + deregister)
+
+        with mock.patch.object(HeartbeatServer, "request_hook", side_effect=hook), \
+             mock.patch("src.heartbeat_server.logger") as mock_logger:
+            server.serve()
+        client.close()
+        server._safe_exit()
+
+        mock_logger.warning.assert_not_called()
+        self.assertEqual([{}, {}], hooks)
+        self.assertEqual([0], server._free)
+
+    def test_request_hook_ignores_recent_heartbeat(self):
+        with mock.patch("src.heartbeat_server.HeartbeatServer.notify"):
+            server = HeartbeatServer()
+            server._register(9999, time.clock_gettime_ns(CLOCK), b"test")
+            server.request_hook()
+            server.notify.assert_not_called()
+            server._safe_exit()
+
+    def test_scan_stale_returns_indexes_below_threshold(self):
+        last = array("q", [5, 20, 9, 2 ** 63 - 1, 10])
+        self.assertEqual([0, 2], _scan_stale(last, 10))
+
+    def test_scan_stale_no_stale_clients(self):
+        self.assertEqual([], _scan_stale(array("q", [20, 2 ** 63 - 1]), 10))
+        self.assertEqual([], _scan_stale(array("q"), 10))
@@ -0,0 +1,73 @@
+import logging
+import unittest
+import unittest.mock as mock
+
+from logging.handlers import QueueHandler
+
+import src
+
+from src import start_queue_logging
+
+
+class _Collect(logging.Handler):
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class TestQueueLogging(unittest.TestCase):
+
+    def setUp(self):
+        self.handlers = list(src.logger.handlers)
+        self.propagate = src.logger.propagate
+
+    def tearDown(self):
+        src.logger.handlers = self.handlers
+        src.logger.propagate = self.propagate
+
+    def test_records_reach_handler_through_listener(self):
+        handler = _Collect()
+        listener = start_queue_logging(handler)
+
+        logging.getLogger("src.heartbeat_server").warning("Missed Heartbeat | %s", 9999)
+        listener.stop()
+
+        self.assertEqual(["Missed Heartbeat | 9999"], handler.messages)
+
+    def test_package_logger_stops_propagating(self):
+        listener = start_queue_logging(_Collect())
+        propagate = src.logger.propagate
+        listener.stop()
+
+        self.assertEqual(False, propagate)
+
+    def test_stop_detaches_queue_handler(self):
+        listener = start_queue_logging(_Collect())
+        listener.stop()
+
+        self.assertEqual(self.handlers, src.logger.handlers)
+        self.assertEqual(self.propagate, src.logger.propagate)
+
+    def test_restart_replaces_listener(self):
+        first, second = _Collect(), _Collect()
+        start_queue_logging(first)
+        listener = start_queue_logging(second)
+        queue_handlers = [h for h in src.logger.handlers if isinstance(h, QueueHandler)]
+
+        logging.getLogger("src.heartbeat_server").warning("Missed Heartbeat | %s", 9999)
+        listener.stop()
+
+        self.assertEqual(1, len(queue_handlers))
+        self.assertEqual([], first.messages)
+        self.assertEqual(["Missed Heartbeat | 9999"], second.messages)
+
+    def test_falls_back_to_last_resort(self):
+        with mock.patch.object(logging.getLogger(), "handlers", []):
+            listener = start_queue_logging()
+        listener.stop()
+
+        self.assertEqual([logging.lastResort], list(listener.handlers))
@@ -1,53 +1,137 @@
+import os
+import sys
 import unittest
-import time
 import unittest.mock as mock
 
-from socket import AF_UNIX, SOCK_DGRAM
-from threading import Thread
+from socket import (AF_UNIX, MSG_PEEK, MSG_TRUNC, SOCK_DGRAM, SOCK_SEQPACKET, SOCK_STREAM,
+                    SOL_SOCKET, SO_RCVBUF, SO_SNDBUF, socket)
 
-from src.socket_server import UnixSocketServer
+from src.socket_server import (_SOCK_DIR, _SOCK_FLAGS, RCVBUF_DEF, SNDBUF_DEF, STREAM_READ_DEF,
+                               UnixSocketServer)
 
 
 class TestSocketServer(unittest.TestCase):
-
     def setUp(self):
         self.server = UnixSocketServer(timeout=5, bufsize=16, bind=False)
-    
+
     def tearDown(self):
         try:
             self.server._safe_exit()
-        except:
+        except OSError:
             pass
 
+    def test_tear_down_only_catches_oserror(self):
+        with mock.patch.object(UnixSocketServer, "_safe_exit", side_effect=ValueError):
+            with self.assertRaises(ValueError):
+                self.tearDown()
+
     def test_constructor_sets_timeout(self):
         self.assertEqual(self.server.timeout, 5)
-    
+
     def test_constructor_sets_bufsize(self):
         self.assertEqual(self.server.bufsize, 16)
 
     def test_constructor_sets_path(self): # Add path?
         self.assertEqual(self.server.path, None)
-    
-    def test_socket_initialized_with_address_and_family(self):
-        with mock.patch("socket.socket") as mock_socket:
-            mock_socket.return_value.socket.return_value = None
-            server = UnixSocketServer(timeout=5, bufsize=16, bind=True)
-        mock_socket.assert_called_with(family=AF_UNIX, type=SOCK_DGRAM)
-    
-    def test_recvfrom_called_with_bufsize(self):
-        with mock.patch("socket.socket") as mock_socket:
-            mock_socket.return_value.recvfrom.return_value = 0, 0
-            server = UnixSocketServer(timeout=5, bufsize=16, bind=True)
-            server.get_request()
-        server._socket.recvfrom.assert_called_with(16)
-    
-    def test_get_request_returns_recvfrom_response(self):
-        with mock.patch("socket.socket") as mock_socket:
-            mock_socket.return_value.recvfrom.return_value = "arb_bytes", "arb_address"
-            server = UnixSocketServer(timeout=5, bufsize=16, bind=True)
-            b, a = server.get_request()
-        self.assertEqual(b, "arb_bytes")
-        self.assertEqual(a, "arb_address")
+
+    def test_busy_poll_requires_dgram(self):
+        with self.assertRaises(ValueError):
+            UnixSocketServer(timeout=5, bufsize=16, bind=False, busy_poll=True, socktype=SOCK_STREAM)
+
+    def test_get_connection_request_returns_recv_and_peercred(self):
+        conn = mock.Mock()
+        conn.recv.return_value = b"data"
+        result = self.server.get_connection_request(conn, (1, 2, 3))
+        conn.recv.assert_called_with(16)
+        self.assertEqual(result, (b"data", (1, 2, 3)))
+
+    def test_get_connection_request_reads_stream_in_chunks(self):
+        server = UnixSocketServer(timeout=5, bufsize=16, bind=False, socktype=SOCK_STREAM)
+        conn = mock.Mock()
+        conn.recv_into.return_value = 4
+        server._stream_mv[:4] = b"data"
+
+        data, peercred = server.get_connection_request(conn, (1, 2, 3))
+
+        self.assertEqual(STREAM_READ_DEF, len(conn.recv_into.call_args.args[0]))
+        self.assertEqual((b"data", (1, 2, 3)), (data, peercred))
+        server._safe_exit()
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "AF_UNIX SOCK_SEQPACKET requires Linux")
+    def test_serve_accepts_seqpacket_connections(self):
+        requests = []
+
+        def handle(request):
+            requests.append(request)
+            server._stop.set()
+
+        server = UnixSocketServer(timeout=0.05, bufsize=16, socktype=SOCK_SEQPACKET)
+        client = socket(AF_UNIX, SOCK_SEQPACKET)
+        client.connect(server.path)
+        client.send(b"data")
+
+        with mock.patch.object(UnixSocketServer, "handle_request", side_effect=handle):
+            server.serve()
+        client.close()
+
+        data, peercred = requests[0]
+        self.assertEqual(data, b"data")
+        if sys.platform.startswith("linux"):
+            self.assertEqual(peercred[0], os.getpid())
+        server._safe_exit()
+
+    def test_server_socket_non_blocking(self):
+        self.assertEqual(0.0, self.server._socket.gettimeout())
+
+    def test_recv_is_bound_method(self):
+        self.assertEqual(self.server._recv, self.server._socket.recv_into)
+
+    def test_get_requests_reads_queued_datagrams(self):
+        server = UnixSocketServer(timeout=5, bufsize=16)
+        with socket(AF_UNIX, SOCK_DGRAM) as client:
+            for packet in (b"first", b"second", b"third"):
+                client.sendto(packet, server.path)
+            requests = server.get_requests()
+        self.assertEqual([b"first", b"second", b"third"], [bytes(r) for r, _ in requests])
+        server._safe_exit()
+
+    def test_get_requests_respects_max_batch(self):
+        server = UnixSocketServer(timeout=5, bufsize=16)
+        with socket(AF_UNIX, SOCK_DGRAM) as client:
+            for packet in (b"first", b"second", b"third"):
+                client.sendto(packet, server.path)
+            self.assertEqual(2, len(server.get_requests(max_batch=2)))
+            self.assertEqual(1, len(server.get_requests(max_batch=2)))
+        server._safe_exit()
+
+    def test_get_requests_batches(self):
+        server = UnixSocketServer(timeout=5, bufsize=16, bind=False)
+        with mock.patch("src._mmsg.recvmmsg", return_value=0) as mock_recvmmsg:
+            server.get_requests(8)
+        mock_recvmmsg.assert_called_once_with(server.fileno(), server._batch.msgs, 8, 0, None)
+        server._safe_exit()
+
+    def test_get_requests_prefers_recvmmsg(self):
+        server = UnixSocketServer(timeout=5, bufsize=16, bind=False)
+        with mock.patch("src._mmsg.recvmmsg", return_value=0), \
+             mock.patch.object(server, "_recv") as mock_recv:
+            server.get_requests()
+        mock_recv.assert_not_called()
+        server._safe_exit()
+
+    def test_get_requests_empty_socket(self):
+        server = UnixSocketServer(timeout=5, bufsize=16)
+        self.assertEqual([], server.get_requests())
+        server._safe_exit()
+
+    def test_get_requests_without_recvmmsg(self):
+        server = UnixSocketServer(timeout=5, bufsize=16)
+        with mock.patch("src._mmsg.recvmmsg", None), socket(AF_UNIX, SOCK_DGRAM) as client:
+            for packet in (b"first", b"second"):
+                client.sendto(packet, server.path)
+            requests = server.get_requests()
+        self.assertEqual([b"first", b"second"], [bytes(r) for r, _ in requests])
+        server._safe_exit()
 
     def test_bind_default_parameter(self):
         with mock.patch("src.socket_server.UnixSocketServer._bind_local") as mock_bind:
@@ -61,27 +145,185 @@ class TestSocketServer(unittest.TestCase):
             mock_bind.assert_not_called()
         server._safe_exit()
 
+    @unittest.skipUnless(sys.platform.startswith("linux"), "abstract namespace requires Linux")
+    def test_bind_abstract_namespace(self):
+        with mock.patch("os.unlink") as mock_unlink:
+            server = UnixSocketServer(timeout=5, bufsize=16, abstract=True)
+            self.assertEqual(True, server.path.startswith("\0server."))
+            self.assertEqual(server.path.encode(), server._socket.getsockname())
+            server._safe_exit()
+        mock_unlink.assert_not_called()
+
+    def test_safe_exit_destroys_fd(self):
+        self.server._safe_exit()
+        self.assertEqual(-1, self.server.fileno())
+
+    def test_cleanup_swallows_missing_file(self):
+        server = UnixSocketServer(timeout=5, bufsize=16)
+        with mock.patch("os.unlink", side_effect=FileNotFoundError):
+            server._cleanup()
+        server._safe_exit()
+
+    def test_pair_has_no_path_and_skips_unlink(self):
+        a, b = UnixSocketServer.pair(timeout=5, bufsize=16)
+        a._socket.send(b"data")
+        data, _ = b.get_request()
+        self.assertEqual(b"data", data)
+        self.assertEqual((None, None), (a.path, b.path))
+        with mock.patch("os.unlink") as mock_unlink:
+            a._safe_exit()
+            b._safe_exit()
+        mock_unlink.assert_not_called()
+
+    def test_pair_safe_exit_twice(self):
+        a, b = UnixSocketServer.pair(timeout=5, bufsize=16)
+        for server in (a, b, a, b):
+            server._safe_exit()
+
+    def test_shutdown_blocks(self):
+        with mock.patch("threading.Event.wait"):
+            self.assertEqual(self.server._stop.is_set(), False)
+            self.server.shutdown()
+            self.assertEqual(self.server._stop.is_set(), True)
+            self.server._stopped.wait.assert_called()
+
+    def test_serve_notifies_blocked_thread(self):
+        # Ensure serve wakes up blocked thread when self._stop is set
+        self.server._stop.set()
+        self.server.serve()
+        self.assertEqual(self.server._stopped.is_set(), True)
+
+    def test_serve_polling_handles_requests(self):
+        def stop(request):
+            self.server._stop.set()
+
+        self.server.busy_poll = True
+        with mock.patch.object(UnixSocketServer, "get_requests", return_value=[(b"data", None)]), \
+             mock.patch.object(UnixSocketServer, "handle_request", side_effect=stop) as mock_handle:
+            self.server.serve()
+        mock_handle.assert_called_with((b"data", None))
+        self.assertEqual(self.server._stopped.is_set(), True)
+
+    def test_shutdown_releases_block_with_notify(self):
+        # More of an integration test?
+        pass
+
+    def test_safe_exit(self):
+        pass
+
+
+class TestSocketServerMockedSocket(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch("socket.socket")
+        self.mock_socket = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_socket_initialized_with_address_and_family(self):
+        self.mock_socket.return_value.socket.return_value = None
+        UnixSocketServer(timeout=5, bufsize=16, bind=True)
+        self.mock_socket.assert_called_with(family=AF_UNIX, type=SOCK_DGRAM | _SOCK_FLAGS)
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "socket type flags require Linux")
+    def test_socket_created_non_blocking(self):
+        server = UnixSocketServer(timeout=5, bufsize=16, bind=False)
+        server._socket.setblocking.assert_not_called()
+
+    def test_socket_initialized_dgram(self):
+        server = UnixSocketServer(timeout=5, bufsize=16, bind=True, socktype=SOCK_DGRAM)
+        self.mock_socket.assert_called_with(family=AF_UNIX, type=SOCK_DGRAM | _SOCK_FLAGS)
+        server._socket.listen.assert_not_called()
+
+    def test_socket_initialized_stream(self):
+        server = UnixSocketServer(timeout=5, bufsize=16, bind=True, socktype=SOCK_STREAM)
+        self.mock_socket.assert_called_with(family=AF_UNIX, type=SOCK_STREAM | _SOCK_FLAGS)
+        server._socket.listen.assert_called_once()
+
+    def test_fd_injection_skips_socket_and_bind(self):
+        with mock.patch("socket.fromfd") as mock_fromfd, \
+             mock.patch.object(UnixSocketServer, "_bind_local") as mock_bind:
+            server = UnixSocketServer(timeout=5, bufsize=16, path="/simulated/path/to/socket.s", fd=3)
+        mock_fromfd.assert_called_with(3, AF_UNIX, SOCK_DGRAM)
+        self.mock_socket.assert_not_called()
+        mock_bind.assert_not_called()
+        self.assertEqual(None, server.path)
+
+    def test_socket_receive_buffer_enlarged(self):
+        server = UnixSocketServer(timeout=5, bufsize=16, bind=False)
+        server._socket.setsockopt.assert_any_call(SOL_SOCKET, SO_RCVBUF, RCVBUF_DEF)
+        server._socket.setsockopt.assert_any_call(SOL_SOCKET, SO_SNDBUF, SNDBUF_DEF)
+
+    def test_socket_buffers_use_requested_sizes(self):
+        server = UnixSocketServer(timeout=5, bufsize=16, bind=False, rcvbuf=1 << 20, sndbuf=1 << 16)
+        server._socket.setsockopt.assert_any_call(SOL_SOCKET, SO_RCVBUF, 1 << 20)
+        server._socket.setsockopt.assert_any_call(SOL_SOCKET, SO_SNDBUF, 1 << 16)
+
+    def test_busy_poll_disabled_by_default(self):
+        server = UnixSocketServer(timeout=5, bufsize=16, bind=False)
+        self.assertEqual(False, server.busy_poll)
+
+    def test_recv_into_called_with_bufsize(self):
+        self.mock_socket.return_value.recv_into.return_value = 0
+        server = UnixSocketServer(timeout=5, bufsize=16, bind=True)
+        server.get_request()
+        server._socket.recv_into.assert_called_with(server._mv, 16)
+
+    def test_get_request_returns_recv_into_response(self):
+        self.mock_socket.return_value.recv_into.return_value = 9
+        server = UnixSocketServer(timeout=5, bufsize=16, bind=True)
+        server._recv_buf[:9] = b"arb_bytes"
+        b, a = server.get_request()
+        self.assertEqual(b, b"arb_bytes")
+        self.assertEqual(a, None)
+
+    def test_autosize_peeks_then_grows(self):
+        self.mock_socket.return_value.recv_into.side_effect = [4096, 4096]
+        server = UnixSocketServer(timeout=5, bufsize=16, bind=False, autosize=True)
+        server.get_request()
+        peek, read = server._socket.recv_into.call_args_list
+        self.assertEqual((1, MSG_PEEK | MSG_TRUNC), peek.args[1:])
+        self.assertEqual(mock.call(server._mv, 4096), read)
+        self.assertEqual(4096, server.bufsize)
+
     def test_bind_explicit_path(self):
-        with mock.patch("socket.socket"):
-            server = UnixSocketServer(timeout=5, bufsize=16, path="/simulated/path/to/socket.s")
+        server = UnixSocketServer(timeout=5, bufsize=16, path="/simulated/path/to/socket.s")
         server._socket.bind.assert_called_with("/simulated/path/to/socket.s")
 
     def test_binds_to_generated_path(self):
-        with mock.patch("socket.socket"):
-            server = UnixSocketServer(timeout=5, bufsize=16)
+        server = UnixSocketServer(timeout=5, bufsize=16)
         bind_path = server.path
         server._socket.bind.assert_called_with(bind_path)
 
     def test_bind_generated_correct_path(self):
-        with mock.patch("socket.socket"):
-            server = UnixSocketServer(timeout=5, bufsize=16)
+        server = UnixSocketServer(timeout=5, bufsize=16)
         bind_path = server.path
         self.assertEqual(True, bind_path.startswith("/tmp/unx_ss/server."))
 
-    def test_safe_exit_destroys_fd(self):
-        self.server._safe_exit()
-        self.assertEqual(-1, self.server.fileno())
-    
+    def test_sock_dir_created_once(self):
+        with mock.patch("os.makedirs") as mock_makedirs:
+            UnixSocketServer(timeout=5, bufsize=16)
+            UnixSocketServer(timeout=5, bufsize=16)
+        self.assertLessEqual(mock_makedirs.call_count, 1)
+
+    def test_bind_recreates_removed_sock_dir(self):
+        self.mock_socket.return_value.bind.side_effect = [FileNotFoundError, None]
+        with mock.patch("os.makedirs") as mock_makedirs:
+            server = UnixSocketServer(timeout=5, bufsize=16)
+        mock_makedirs.assert_called_once_with(_SOCK_DIR, exist_ok=True)
+        self.assertEqual(2, server._socket.bind.call_count)
+
+    def test_bind_explicit_path_missing_dir_raises(self):
+        self.mock_socket.return_value.bind.side_effect = FileNotFoundError
+        with mock.patch("os.makedirs") as mock_makedirs, self.assertRaises(FileNotFoundError):
+            UnixSocketServer(timeout=5, bufsize=16, path="/simulated/path/to/socket.s")
+        mock_makedirs.assert_not_called()
+
+    def test_path_is_16_hex_chars(self):
+        server = UnixSocketServer(timeout=5, bufsize=16)
+        ident = server.path.rsplit(".", 1)[1]
+        self.assertEqual(16, len(ident))
+        int(ident, 16)
+
     def test_cleanup_unlinks_socket_file(self):
         # Mock os.unlink
         # make sure its called with correct path
@@ -90,25 +332,3 @@ class TestSocketServer(unittest.TestCase):
             server = UnixSocketServer(timeout=5, bufsize=16)
             server._cleanup()
         mock_unlink.assert_called_with(server.path)
-        server._socket.close()
-
-    def test_shutdown_blocks(self):
-        with mock.patch("threading.Condition.wait"):
-            self.assertEqual(self.server._shutdown, False)
-            self.server.shutdown()
-            self.assertEqual(self.server._shutdown, True)
-            self.server._condition.wait.assert_called()
-
-    def test_serve_notifies_blocked_thread(self):
-        # Ensure serve wakes up blocked thread when self._shutdown is True
-        with mock.patch("threading.Condition.notify_all"):
-            self.server._shutdown = True
-            self.server.serve()
-            self.server._condition.notify_all.assert_called()
-
-    def test_shutdown_releases_block_with_notify(self):
-        # More of an integration test?
-        pass
-    
-    def test_safe_exit(self):
-        pass
\ No newline at end of file